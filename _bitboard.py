@@ -0,0 +1,66 @@
+import numpy as np
+from functools import lru_cache
+
+# Bitboard helpers used by GomokuEngine.
+# A board of R x C cells is stored in a Python int with cell (row, col) at bit
+# row * stride + col, where stride = C + 1. The extra guard column is always
+# clear, so shifting along a row or diagonal can never wrap a line onto the
+# next row; Python ints make this work for any board size.
+
+
+def _axis_steps(stride: int) -> tuple:
+    """Bit offsets of one step along each axis: horizontal, vertical and both diagonals."""
+    return (1, stride, stride + 1, stride - 1)
+
+
+def pack(mask: np.ndarray) -> int:
+    """Pack a 2D boolean mask into a bitboard."""
+    rows, cols = mask.shape
+    padded = np.zeros((rows, cols + 1), dtype=bool)
+    padded[:, :cols] = mask
+    return int.from_bytes(np.packbits(padded, bitorder='little').tobytes(), 'little')
+
+
+@lru_cache(maxsize=None)
+def full_mask(rows: int, cols: int) -> int:
+    """Bitboard with every on-board cell set."""
+    return pack(np.ones((rows, cols), dtype=bool))
+
+
+def cells(bits: int, rows: int, cols: int) -> list:
+    """List the (row, col) of every set cell, in row-major order."""
+    stride = cols + 1
+    raw = np.frombuffer(bits.to_bytes((rows * stride + 7) // 8, 'little'), dtype=np.uint8)
+    flat = np.flatnonzero(np.unpackbits(raw, bitorder='little'))
+    return list(zip((flat // stride).tolist(), (flat % stride).tolist()))
+
+
+def _shift(bits: int, offset: int) -> int:
+    """Move every bit by -offset, so bit i is set if bit i + offset was."""
+    return bits >> offset if offset >= 0 else bits << -offset
+
+
+def winning_cells(stones: int, empty: int, stride: int) -> int:
+    """
+    Find every empty cell that completes a line of five or more stones.
+    For each axis, a cell wins if it is the gap in some 5-cell window whose
+    other 4 cells all hold stones.
+    """
+    wins = 0
+    for step in _axis_steps(stride):
+        for gap in range(5):
+            hits = empty
+            for k in range(5):
+                if k != gap:
+                    hits &= _shift(stones, (k - gap) * step)
+            wins |= hits
+    return wins
+
+
+def dilate(bits: int, mask: int, stride: int, radius: int) -> int:
+    """Grow every set cell into the (2 * radius + 1) square around it, clipped to mask."""
+    for _ in range(radius):
+        bits |= ((bits << 1) | (bits >> 1)) & mask
+    for _ in range(radius):
+        bits |= ((bits << stride) | (bits >> stride)) & mask
+    return bits
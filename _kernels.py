@@ -0,0 +1,167 @@
+import numpy as np
+from numba import njit
+
+# Compiled line-scanning kernels used by GomokuEngine.
+# Kept free of any engine state so they can run without the GIL.
+# build_kernels.py compiles the same functions ahead of time into _gomoku_kernels.
+
+
+# Axes scanned when scoring a move: vertical, horizontal and both diagonals
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+# Threat patterns and their scores. Numba embeds these as compile-time constants.
+# Five in a row (win)
+FIVE = 100000.0
+# Open four (one move away from winning)
+OPEN_FOUR = 10000.0
+# Closed four (can be blocked)
+CLOSED_FOUR = 5000.0
+# Open three (can lead to open four)
+OPEN_THREE = 1000.0
+# Closed three (can be blocked)
+CLOSED_THREE = 500.0
+# Open two
+OPEN_TWO = 100.0
+# Closed two
+CLOSED_TWO = 50.0
+
+
+@njit(cache=True, nogil=True, fastmath=False)
+def _cell(board, row, col):
+    """Return the stone at (row, col), or -1 when the cell is off the board."""
+    if 0 <= row < board.shape[0] and 0 <= col < board.shape[1]:
+        return board[row, col]
+    return -1
+
+
+@njit(cache=True, nogil=True, fastmath=False)
+def _run_length(board, row, col, dr, dc, player):
+    """
+    Length of the line of 'player' stones through (row, col) in direction (dr, dc),
+    treating (row, col) itself as holding a 'player' stone. Each side is scanned
+    at most 4 cells, which is all a five needs.
+    """
+    count = 1
+
+    # Count in positive direction
+    r, c = row + dr, col + dc
+    steps = 0
+    while steps < 4 and _cell(board, r, c) == player:
+        count += 1
+        steps += 1
+        r += dr
+        c += dc
+
+    # Count in negative direction
+    r, c = row - dr, col - dc
+    steps = 0
+    while steps < 4 and _cell(board, r, c) == player:
+        count += 1
+        steps += 1
+        r -= dr
+        c -= dc
+
+    return count
+
+
+@njit(cache=True, nogil=True, fastmath=False)
+def _has_open_end(board, row, col, dr, dc, length):
+    """Check if the cell 'length' steps away from (row, col) is empty on either side."""
+    return (_cell(board, row + dr * length, col + dc * length) == 0 or
+            _cell(board, row - dr * length, col - dc * length) == 0)
+
+
+@njit(cache=True, nogil=True, fastmath=False)
+def _line_upper_bound(own, opp):
+    """Highest score one axis can add given the line lengths, assuming every end is open."""
+    bound = 0.0
+    if opp >= 5:
+        bound += FIVE * 0.9
+    if own >= 4:
+        bound += OPEN_FOUR
+    if own >= 3:
+        bound += OPEN_THREE
+    if own >= 2:
+        bound += OPEN_TWO
+    if opp >= 4:
+        bound += OPEN_FOUR * 0.8
+    if opp >= 3:
+        bound += OPEN_THREE * 0.7
+    return bound
+
+
+@njit(cache=True, nogil=True, fastmath=False)
+def evaluate_move_kernel(board, row, col, player, opponent, cutoff):
+    """
+    Score the line patterns created or blocked by playing (row, col).
+
+    Each of the 4 axes is walked once per player and every pattern category is
+    derived from the resulting line lengths, instead of rescanning the line once
+    per pattern. The board is not modified: (row, col) is treated as holding the
+    stone being tested.
+
+    Wins are detected first. If the line lengths alone show the move cannot
+    score above 'cutoff', the open-end checks are skipped and -inf is returned.
+
+    Returns a (score, is_win) tuple; on a win the score is FIVE.
+    """
+    own_lengths = np.empty(4, dtype=np.int64)
+    opp_lengths = np.empty(4, dtype=np.int64)
+    upper_bound = 0.0
+    axis = 0
+    for dr, dc in DIRECTIONS:
+        own = _run_length(board, row, col, dr, dc, player)
+        if own >= 5:
+            return FIVE, True  # Immediate win
+        opp = _run_length(board, row, col, dr, dc, opponent)
+        own_lengths[axis] = own
+        opp_lengths[axis] = opp
+        upper_bound += _line_upper_bound(own, opp)
+        axis += 1
+
+    if upper_bound <= cutoff:
+        return -np.inf, False
+
+    score = 0.0
+    axis = 0
+    for dr, dc in DIRECTIONS:
+        own = own_lengths[axis]
+        opp = opp_lengths[axis]
+        axis += 1
+
+        # Blocking opponent's winning move
+        if opp >= 5:
+            score += FIVE * 0.9
+
+        # Creating fours, threes and twos
+        if own >= 4:
+            if _has_open_end(board, row, col, dr, dc, 4):
+                score += OPEN_FOUR
+            else:
+                score += CLOSED_FOUR
+        if own >= 3:
+            if _has_open_end(board, row, col, dr, dc, 3):
+                score += OPEN_THREE
+            else:
+                score += CLOSED_THREE
+        if own >= 2:
+            if _has_open_end(board, row, col, dr, dc, 2):
+                score += OPEN_TWO
+            else:
+                score += CLOSED_TWO
+
+        # Blocking opponent's fours and open threes
+        if opp >= 4:
+            if _has_open_end(board, row, col, dr, dc, 4):
+                score += OPEN_FOUR * 0.8
+            else:
+                score += CLOSED_FOUR * 0.8
+        if opp >= 3 and _has_open_end(board, row, col, dr, dc, 3):
+            score += OPEN_THREE * 0.7
+
+    return score, False
+
+
+def warm_up():
+    """Compile the kernels now so the first API request doesn't pay the JIT cost."""
+    evaluate_move_kernel(np.zeros((15, 15), dtype=np.int8), 7, 7, 1, 2, -np.inf)
@@ -1,12 +1,44 @@
 from flask import Flask, request, jsonify
 from gomoku_engine import GomokuEngine
 import numpy as np
+import itertools
 import json
+import threading
 import traceback
+from collections import OrderedDict
 
 app = Flask(__name__)
-# Initialize with default board size, will be updated based on input
-engine = GomokuEngine()
+
+# Largest board size accepted by the API
+MAX_BOARD_SIZE = 25
+
+# One engine per board size, created on first use so its opening book and
+# Zobrist keys are built once and shared by every request of that size.
+# At most MAX_ENGINES are kept, least recently used first, so memory stays
+# bounded however many sizes clients ask for. Each engine has its own
+# transposition table budget (16 MB by default), so the tables total at most
+# MAX_ENGINES x 16 MB = 64 MB.
+MAX_ENGINES = 4
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+def get_engine(board_size):
+    """Return the engine for the given board size, creating it if needed."""
+    with _engines_lock:
+        engine = _engines.get(board_size)
+        if engine is not None:
+            _engines.move_to_end(board_size)
+            return engine
+
+    # Build outside the lock so other sizes aren't held up; if two requests race
+    # to create the same size, the first one stored wins
+    engine = GomokuEngine(board_size=board_size)
+    with _engines_lock:
+        engine = _engines.setdefault(board_size, engine)
+        _engines.move_to_end(board_size)
+        if len(_engines) > MAX_ENGINES:
+            _engines.popitem(last=False)
+    return engine
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -54,16 +86,33 @@ def get_best_move():
         # Get board dimensions
         board_size = len(board)
 
-        # Update engine board size if needed
-        if engine.board_size != board_size:
-            engine.board_size = board_size
+        # The engine works on square boards only
+        if len(board[0]) != board_size:
+            return jsonify({"error": "Board must be square"}), 400
+
+        if board_size > MAX_BOARD_SIZE:
+            return jsonify({"error": f"Board size must be at most {MAX_BOARD_SIZE}"}), 400
+
+        # Cells index the engine's Zobrist keys, so only known values are accepted
+        if any(cell not in (0, 1, 2) for row in board for cell in row):
+            return jsonify({"error": "Board cells must be 0 (empty), 1 (black) or 2 (white)"}), 400
 
         # Validate player
         if player not in [1, 2]:
             return jsonify({"error": "Player must be 1 (black) or 2 (white)"}), 400
 
+        # JSON 1.0 and true compare equal to 1; the engine indexes its tables with
+        # the player, so normalise it to a plain int
+        player = int(player)
+
+        # Build the board array straight from the flattened rows, which is cheaper
+        # than letting NumPy inspect the nested lists
+        board_array = np.fromiter(itertools.chain.from_iterable(board), dtype=np.int8,
+                                  count=board_size * board_size).reshape(board_size, board_size)
+
         # Get the best move
-        row, col = engine.get_best_move(board, player)
+        engine = get_engine(board_size)
+        row, col = engine.get_best_move_arr(board_array, player)
 
         return jsonify({
             "move": [int(row), int(col)],
@@ -110,5 +159,6 @@ def index():
     """
 
 if __name__ == '__main__':
-    # Use a single worker to minimize resource usage
-    app.run(host='0.0.0.0', port=5000, debug=False, threaded=False)
+    # Single process to minimize resource usage; threads let health checks and
+    # cached lookups proceed while another request is computing a move
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
@@ -0,0 +1,24 @@
+"""
+Compile the Numba kernels ahead of time into the _gomoku_kernels extension module.
+
+Run once at build time (the Dockerfile does this):
+    python build_kernels.py
+
+gomoku_engine imports the compiled module when it is present, so the service
+starts without JIT warmup; otherwise it falls back to the JIT kernels in _kernels.
+"""
+from numba import types
+from numba.pycc import CC
+
+from _kernels import evaluate_move_kernel
+
+cc = CC('_gomoku_kernels')
+
+# evaluate_move_kernel(board, row, col, player, opponent, cutoff) -> (score, is_win)
+cc.export('evaluate_move_kernel',
+          types.Tuple((types.float64, types.boolean))(
+              types.int8[:, :], types.int64, types.int64, types.int64, types.int64,
+              types.float64))(evaluate_move_kernel.py_func)
+
+if __name__ == '__main__':
+    cc.compile()
@@ -1,7 +1,25 @@
 import numpy as np
+import itertools
+import threading
+from collections import OrderedDict
 from typing import Tuple, List, Optional, Dict
 import time
 
+from _bitboard import cells, dilate, full_mask, pack, winning_cells
+from _kernels import (FIVE, OPEN_FOUR, CLOSED_FOUR, OPEN_THREE, CLOSED_THREE, OPEN_TWO,
+                      CLOSED_TWO)
+
+try:
+    # Ahead-of-time compiled kernels, built by build_kernels.py
+    from _gomoku_kernels import evaluate_move_kernel
+except ImportError:
+    from _kernels import evaluate_move_kernel, warm_up
+    warm_up()
+
+# Approximate memory held by one transposition table entry (OrderedDict node,
+# int key and (row, col) value) on CPython, used to size the table from a budget
+_TT_ENTRY_BYTES = 200
+
 class GomokuEngine:
     """
     A lightweight Gomoku (Five in a Row) engine optimized for low resource usage.
@@ -9,33 +27,44 @@ class GomokuEngine:
     Inspired by the winning strategy from https://github.com/fucusy/gomoku-first-move-always-win
     """
 
-    def __init__(self, board_size: int = 15):
-        """Initialize the Gomoku engine with an empty board."""
-        self.board_size = board_size
+    def __init__(self, board_size: int = 15, tt_memory_budget: int = 16 * 1024 * 1024):
+        """
+        Initialize the Gomoku engine with an empty board.
+
+        Args:
+            board_size: Number of rows (and columns) of the board
+            tt_memory_budget: Approximate bytes the transposition table may use
+        """
         self.empty = 0
         self.black = 1  # Player 1
         self.white = 2  # Player 2
 
-        # Opening book for black (first player)
-        # Key: board state as string, Value: best move as (row, col)
-        self.opening_book = self._initialize_opening_book()
+        # Also builds the Zobrist keys and the opening book for this size
+        self.board_size = board_size
 
-        # Threat patterns and their scores
+        # Transposition table of computed best moves, least recently used first
+        # Key: Zobrist hash of the board and player to move, Value: best move as (row, col)
+        # The budget applies to this engine only; callers holding several engines
+        # use that many budgets.
+        # Guarded by a lock since one engine is shared by concurrent requests.
+        self._tt = OrderedDict()
+        self._tt_size = max(1, tt_memory_budget // _TT_ENTRY_BYTES)
+        self._tt_lock = threading.Lock()
+
+        # Optional hook called with the seconds spent scoring moves; timing is
+        # skipped entirely while this is None
+        self.profile_callback = None
+
+        # Threat patterns and their scores, kept for reference. Scoring reads the
+        # module-level constants directly.
         self.threat_patterns = {
-            # Five in a row (win)
-            'five': 100000,
-            # Open four (one move away from winning)
-            'open_four': 10000,
-            # Closed four (can be blocked)
-            'closed_four': 5000,
-            # Open three (can lead to open four)
-            'open_three': 1000,
-            # Closed three (can be blocked)
-            'closed_three': 500,
-            # Open two
-            'open_two': 100,
-            # Closed two
-            'closed_two': 50
+            'five': FIVE,
+            'open_four': OPEN_FOUR,
+            'closed_four': CLOSED_FOUR,
+            'open_three': OPEN_THREE,
+            'closed_three': CLOSED_THREE,
+            'open_two': OPEN_TWO,
+            'closed_two': CLOSED_TWO
         }
 
     @property
@@ -45,55 +74,65 @@ class GomokuEngine:
 
     @board_size.setter
     def board_size(self, size: int):
-        """Set the board size."""
+        """Set the board size and rebuild the tables that depend on it."""
         self._board_size = size
 
-    def _initialize_opening_book(self) -> Dict[str, Tuple[int, int]]:
+        # Zobrist keys: one random 64-bit value per (row, col, stone) so a board
+        # hashes to the XOR of the keys of its stones. Seeded to keep hashes stable.
+        rng = np.random.RandomState(0)
+        self._zobrist = rng.randint(0, 2**63, size=(size, size, 3), dtype=np.uint64)
+        # Extra key per player so the same stones hash differently for each side to move
+        self._zobrist_player = rng.randint(0, 2**63, size=3, dtype=np.uint64)
+
+        # Opening book for black (first player)
+        # Key: Zobrist hash of the board, Value: best move as (row, col)
+        self.opening_book = self._initialize_opening_book()
+
+    def _initialize_opening_book(self) -> Dict[int, Tuple[int, int]]:
         """
         Initialize the opening book with known good first moves and responses.
         This is a simplified version of the opening book from the winning strategy.
         """
         book = {}
 
+        # The book is laid out around (7, 7); boards too small to hold it rely on
+        # the heuristics alone
+        center = 7
+        if self.board_size < center + 3:
+            return book
+
+        # Keys are built straight from the Zobrist keys of the stones in each
+        # position; an empty board hashes to 0
+        zobrist = self._zobrist
+        black_center = zobrist[center, center, self.black]  # Black plays center
+
         # Empty board - start in the center
-        book[self._board_to_string(np.zeros((15, 15), dtype=np.int8))] = (7, 7)
+        book[0] = (7, 7)
 
         # Common opening patterns and responses
         # These are based on proven winning strategies for black
 
         # If white plays adjacent to center, black should play on the opposite side
-        center = 7
         for dr, dc in [(0, 1), (1, 0), (1, 1), (1, -1)]:
-            board = np.zeros((15, 15), dtype=np.int8)
-            board[center, center] = self.black  # Black plays center
-            board[center + dr, center + dc] = self.white  # White plays adjacent
-            book[self._board_to_string(board)] = (center - dr, center - dc)  # Black plays opposite
+            key = black_center ^ zobrist[center + dr, center + dc, self.white]  # White plays adjacent
+            book[int(key)] = (center - dr, center - dc)  # Black plays opposite
 
         # If white plays two steps away, black should play between
         for dr, dc in [(0, 2), (2, 0), (2, 2), (2, -2)]:
-            board = np.zeros((15, 15), dtype=np.int8)
-            board[center, center] = self.black  # Black plays center
-            board[center + dr, center + dc] = self.white  # White plays two steps away
-            book[self._board_to_string(board)] = (center + dr//2, center + dc//2)  # Black plays between
+            key = black_center ^ zobrist[center + dr, center + dc, self.white]  # White plays two steps away
+            book[int(key)] = (center + dr//2, center + dc//2)  # Black plays between
 
         return book
 
-    def _board_to_string(self, board: np.ndarray) -> str:
+    def _zobrist_hash(self, board: np.ndarray) -> int:
         """
-        Convert a board state to a string representation for the opening book.
-        Only includes positions that have stones to keep the representation compact.
+        Compute the Zobrist hash of a board state. It keys the opening book and,
+        combined with the player to move, the transposition table; it also seeds
+        the move tie-break. Only the occupied cells contribute, so sparse boards
+        hash quickly.
         """
-        positions = []
-        black_positions = np.where(board == self.black)
-        white_positions = np.where(board == self.white)
-
-        for r, c in zip(black_positions[0], black_positions[1]):
-            positions.append(f"B{r},{c}")
-
-        for r, c in zip(white_positions[0], white_positions[1]):
-            positions.append(f"W{r},{c}")
-
-        return "_".join(sorted(positions))
+        rows, cols = np.nonzero(board)
+        return int(np.bitwise_xor.reduce(self._zobrist[rows, cols, board[rows, cols]]))
 
     def get_best_move(self, board: List[List[int]], player: int) -> Tuple[int, int]:
         """
@@ -106,15 +145,46 @@ class GomokuEngine:
         Returns:
             Tuple of (row, col) for the best move
         """
-        start_time = time.time()
-
         # Convert board to numpy array for efficiency
-        board_array = np.array(board, dtype=np.int8)
+        return self.get_best_move_arr(np.array(board, dtype=np.int8), player)
+
+    def get_best_move_arr(self, board_array: np.ndarray, player: int) -> Tuple[int, int]:
+        """
+        Find the best move for the given player on a board that is already a NumPy array.
+        The array is only read, never modified. Arrays of any integer dtype are
+        accepted; they are converted to the contiguous int8 layout the compiled
+        kernels require, which is free for int8 input.
+
+        Args:
+            board_array: 2D int8 array representing the board state (0=empty, 1=black, 2=white)
+            player: Which player to find the best move for (1=black, 2=white)
+
+        Returns:
+            Tuple of (row, col) for the best move
+        """
+        profile_callback = self.profile_callback
+        if profile_callback is not None:
+            start_time = time.perf_counter()
+
+        # The ahead-of-time kernels don't check argument types, so any other dtype
+        # or layout would be misread
+        board_array = np.ascontiguousarray(board_array, dtype=np.int8)
+
+        board_hash = self._zobrist_hash(board_array)
+
+        # Reuse the result if this position was analysed before. The stored move
+        # must still be an empty cell, which guards against hash collisions.
+        tt_key = board_hash ^ int(self._zobrist_player[player])
+        with self._tt_lock:
+            cached_move = self._tt.get(tt_key)
+            if cached_move is not None:
+                self._tt.move_to_end(tt_key)
+        if cached_move is not None and board_array[cached_move] == self.empty:
+            return cached_move
 
         # Check opening book first
-        board_str = self._board_to_string(board_array)
-        if board_str in self.opening_book:
-            return self.opening_book[board_str]
+        if board_hash in self.opening_book:
+            return self.opening_book[board_hash]
 
         # If board is empty or nearly empty, play near the center
         stone_count = np.count_nonzero(board_array)
@@ -122,234 +192,126 @@ class GomokuEngine:
             center = self.board_size // 2
             return (center, center)
 
+        # Pack the position into bitboards once; threat detection and candidate
+        # generation both work from the same set
+        own_stones = pack(board_array == player)
+        opponent_stones = pack(board_array == 3 - player)
+        empty = pack(board_array == self.empty)
+
         # Check for immediate winning moves or blocking opponent's winning moves
-        immediate_move = self._check_immediate_threats(board_array, player)
+        immediate_move = self._check_immediate_threats(board_array, own_stones, opponent_stones, empty)
         if immediate_move:
             return immediate_move
 
         # Get all valid moves (empty cells)
-        valid_moves = self._get_valid_moves(board_array)
+        valid_moves = self._get_valid_moves(board_array, own_stones | opponent_stones, empty)
 
         # If there's only one valid move, return it
         if len(valid_moves) == 1:
             return valid_moves[0]
 
-        # Score each valid move
-        move_scores = {}
-        for move in valid_moves:
-            score = self._evaluate_move(board_array, move, player)
-            move_scores[move] = score
-
-        # Return the move with the highest score
-        best_move = max(move_scores.items(), key=lambda x: x[1])[0]
-
-        # Print time taken for debugging (can be removed in production)
-        elapsed = time.time() - start_time
-        print(f"Move calculation took {elapsed:.3f} seconds")
+        # Score each valid move, most promising first so the best score so far
+        # lets weaker moves be abandoned early, keeping the highest scoring one
+        ordered_moves = self._order_moves(board_array, valid_moves)
+        best_move = ordered_moves[0]
+        best_score = -np.inf
+        for move in ordered_moves:
+            score = self._evaluate_move(board_array, move, player, board_hash, best_score)
+            if score > best_score:
+                best_score, best_move = score, move
+
+        # Remember the result, evicting the least recently used entry when full
+        with self._tt_lock:
+            self._tt[tt_key] = best_move
+            if len(self._tt) > self._tt_size:
+                self._tt.popitem(last=False)
+
+        if profile_callback is not None:
+            profile_callback(time.perf_counter() - start_time)
 
         return best_move
 
-    def _check_immediate_threats(self, board: np.ndarray, player: int) -> Optional[Tuple[int, int]]:
+    def _check_immediate_threats(self, board: np.ndarray, own_stones: int, opponent_stones: int,
+                                 empty: int) -> Optional[Tuple[int, int]]:
         """
         Check for immediate winning moves or blocking opponent's winning moves.
+        Winning cells are found for the whole board at once from the bitboards of
+        each side's stones and of the empty cells.
         """
-        opponent = 3 - player  # Switch between 1 and 2
-
-        # Get all valid moves
-        valid_moves = self._get_valid_moves(board)
-
-        # First check if we can win in one move
-        for move in valid_moves:
-            row, col = move
-            test_board = board.copy()
-            test_board[row, col] = player
-
-            # Check if this move creates a winning line
-            for dr, dc in [(1, 0), (0, 1), (1, 1), (1, -1)]:
-                if self._check_line(test_board, row, col, dr, dc, player, 5):
-                    return move
+        stride = board.shape[1] + 1
 
-        # Then check if we need to block opponent's winning move
-        for move in valid_moves:
-            row, col = move
-            test_board = board.copy()
-            test_board[row, col] = opponent
-
-            # Check if opponent would win with this move
-            for dr, dc in [(1, 0), (0, 1), (1, 1), (1, -1)]:
-                if self._check_line(test_board, row, col, dr, dc, opponent, 5):
-                    return move
+        # First check if we can win in one move, then if we need to block
+        # opponent's winning move
+        for stones in (own_stones, opponent_stones):
+            wins = winning_cells(stones, empty, stride)
+            if wins:
+                # Take the first winning cell in row-major order
+                return divmod((wins & -wins).bit_length() - 1, stride)
 
         return None
 
-    def _get_valid_moves(self, board: np.ndarray) -> List[Tuple[int, int]]:
-        """Get all valid moves (empty cells) on the board."""
-        valid_moves = []
-
+    def _get_valid_moves(self, board: np.ndarray, occupied: int, empty: int) -> List[Tuple[int, int]]:
+        """
+        Get all valid moves (empty cells) on the board, given the bitboards of
+        its occupied and empty cells.
+        """
         # Only consider cells that are near existing stones to reduce search space
-        rows, cols = np.where(board > 0)
-        if len(rows) == 0:
+        if not occupied:
             # If board is empty, return center position
             center = self.board_size // 2
             return [(center, center)]
 
-        # Consider cells within 2 spaces of existing stones
-        for r, c in zip(rows, cols):
-            for dr in range(-2, 3):
-                for dc in range(-2, 3):
-                    nr, nc = r + dr, c + dc
-                    if (0 <= nr < self.board_size and
-                        0 <= nc < self.board_size and
-                        board[nr, nc] == 0 and
-                        (nr, nc) not in valid_moves):
-                        valid_moves.append((nr, nc))
+        # Consider cells within 2 spaces of existing stones by dilating the
+        # occupied bitboard with shift-ORs
+        rows, cols = board.shape
+        near = dilate(occupied, full_mask(rows, cols), cols + 1, 2)
+        return cells(near & empty, rows, cols)
 
-        return valid_moves
+    def _order_moves(self, board: np.ndarray, valid_moves: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """
+        Order candidate moves so the most promising are scored first: moves touching
+        more stones come first, then moves closer to the center.
+        """
+        # Count stones in the 8 cells around every cell
+        rows, cols = board.shape
+        occupied = np.zeros((rows + 2, cols + 2), dtype=np.int8)
+        occupied[1:-1, 1:-1] = board > 0
+        adjacent = np.zeros((rows, cols), dtype=np.int8)
+        for dr in range(3):
+            for dc in range(3):
+                if dr != 1 or dc != 1:
+                    adjacent += occupied[dr:dr + rows, dc:dc + cols]
+
+        moves = np.fromiter(itertools.chain.from_iterable(valid_moves), dtype=np.intp,
+                            count=2 * len(valid_moves)).reshape(-1, 2)
+        center = self.board_size // 2
+        distance_to_center = np.abs(moves - center).sum(axis=1)
+        order = np.lexsort((distance_to_center, -adjacent[moves[:, 0], moves[:, 1]]))
+        return [valid_moves[i] for i in order.tolist()]
 
-    def _evaluate_move(self, board: np.ndarray, move: Tuple[int, int], player: int) -> float:
+    def _evaluate_move(self, board: np.ndarray, move: Tuple[int, int], player: int,
+                       board_hash: int = 0, cutoff: float = -np.inf) -> float:
         """
         Evaluate a potential move and return a score.
         Higher scores indicate better moves.
+        'board_hash' seeds the tie-break so equal moves are ordered differently
+        from one position to the next. Moves that cannot score above 'cutoff'
+        are abandoned early and score -inf.
         """
         opponent = 3 - player  # Switch between 1 and 2
         row, col = move
 
-        # Make a copy of the board and apply the move
-        test_board = board.copy()
-        test_board[row, col] = player
-
-        # Initialize score
-        score = 0.0
-
-        # Check all 4 directions
-        directions = [
-            (1, 0),   # Vertical
-            (0, 1),   # Horizontal
-            (1, 1),   # Diagonal down-right
-            (1, -1),  # Diagonal down-left
-        ]
-
-        # Check for winning move
-        for dr, dc in directions:
-            # Check if this move creates a winning line
-            if self._check_line(test_board, row, col, dr, dc, player, 5):
-                return self.threat_patterns['five']  # Immediate win
-
-        # Check for blocking opponent's winning move
-        test_board[row, col] = opponent
-        for dr, dc in directions:
-            if self._check_line(test_board, row, col, dr, dc, opponent, 5):
-                score += self.threat_patterns['five'] * 0.9  # High priority to block
-
-        # Reset the test board
-        test_board[row, col] = player
-
-        # Check for creating open fours (four in a row with empty spaces at both ends)
-        for dr, dc in directions:
-            if self._check_open_line(test_board, row, col, dr, dc, player, 4):
-                score += self.threat_patterns['open_four']
-            elif self._check_line(test_board, row, col, dr, dc, player, 4):
-                score += self.threat_patterns['closed_four']
-
-        # Check for creating open threes
-        for dr, dc in directions:
-            if self._check_open_line(test_board, row, col, dr, dc, player, 3):
-                score += self.threat_patterns['open_three']
-            elif self._check_line(test_board, row, col, dr, dc, player, 3):
-                score += self.threat_patterns['closed_three']
-
-        # Check for creating open twos
-        for dr, dc in directions:
-            if self._check_open_line(test_board, row, col, dr, dc, player, 2):
-                score += self.threat_patterns['open_two']
-            elif self._check_line(test_board, row, col, dr, dc, player, 2):
-                score += self.threat_patterns['closed_two']
-
-        # Check for blocking opponent's threats
-        test_board[row, col] = opponent
-
-        # Block opponent's open fours
-        for dr, dc in directions:
-            if self._check_open_line(test_board, row, col, dr, dc, opponent, 4):
-                score += self.threat_patterns['open_four'] * 0.8
-            elif self._check_line(test_board, row, col, dr, dc, opponent, 4):
-                score += self.threat_patterns['closed_four'] * 0.8
-
-        # Block opponent's open threes
-        for dr, dc in directions:
-            if self._check_open_line(test_board, row, col, dr, dc, opponent, 3):
-                score += self.threat_patterns['open_three'] * 0.7
-
         # Prefer center and central areas
         center = self.board_size // 2
         distance_to_center = abs(row - center) + abs(col - center)
-        centrality_score = max(0, 10 - distance_to_center) * 10
-        score += centrality_score
+        bonus = max(0, 10 - distance_to_center) * 10
 
-        # Add a small random factor to break ties
-        score += np.random.random() * 0.1
+        # Add a small deterministic factor derived from the position to break ties
+        bonus += (hash((row, col, board_hash)) & 0xFFFF) * 1e-6
 
-        return score
+        # Score attack and defense patterns on all 4 axes in a single compiled pass
+        score, is_win = evaluate_move_kernel(board, row, col, player, opponent, cutoff - bonus)
+        if is_win:
+            return score  # Immediate win
 
-    def _check_line(self, board: np.ndarray, row: int, col: int, dr: int, dc: int,
-                   player: int, length: int) -> bool:
-        """
-        Check if there are 'length' stones of 'player' in a line in direction (dr, dc)
-        starting from (row, col).
-        """
-        count = 0
-
-        # Check in positive direction
-        r, c = row, col
-        while (0 <= r < self.board_size and
-               0 <= c < self.board_size and
-               board[r, c] == player and
-               count < length):
-            count += 1
-            r += dr
-            c += dc
-
-        # Check in negative direction
-        r, c = row - dr, col - dc
-        while (0 <= r < self.board_size and
-               0 <= c < self.board_size and
-               board[r, c] == player and
-               count < length):
-            count += 1
-            r -= dr
-            c -= dc
-
-        return count >= length
-
-    def _check_open_line(self, board: np.ndarray, row: int, col: int, dr: int, dc: int,
-                        player: int, length: int) -> bool:
-        """
-        Check if placing a stone at (row, col) creates an open line of 'length'
-        in direction (dr, dc). An open line has empty spaces at both ends.
-        """
-        # First, check if there's a line of required length
-        if not self._check_line(board, row, col, dr, dc, player, length):
-            return False
-
-        # Now check if at least one end is open
-        # Check positive direction
-        r, c = row, col
-        for _ in range(length):
-            r += dr
-            c += dc
-
-        pos_open = (0 <= r < self.board_size and
-                   0 <= c < self.board_size and
-                   board[r, c] == 0)
-
-        # Check negative direction
-        r, c = row, col
-        for _ in range(length):
-            r -= dr
-            c -= dc
-
-        neg_open = (0 <= r < self.board_size and
-                   0 <= c < self.board_size and
-                   board[r, c] == 0)
-
-        return pos_open or neg_open
+        return score + bonus
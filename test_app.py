@@ -0,0 +1,30 @@
+import pytest
+
+from app import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def _board():
+    board = [[0] * 15 for _ in range(15)]
+    board[7][7] = 1
+    board[7][8] = 2
+    return board
+
+
+@pytest.mark.parametrize('player', [1, 2, 1.0, 2.0, True])
+def test_best_move_accepts_players_equal_to_1_or_2(client, player):
+    """JSON values equal to 1 or 2 (such as 1.0 and true) are answered with a move."""
+    response = client.post('/api/best-move', json={'board': _board(), 'player': player})
+    assert response.status_code == 200
+    row, col = response.get_json()['move']
+    assert _board()[row][col] == 0
+
+
+@pytest.mark.parametrize('player', [0, 3, 1.5, False, '1', None])
+def test_best_move_rejects_other_players(client, player):
+    response = client.post('/api/best-move', json={'board': _board(), 'player': player})
+    assert response.status_code == 400
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+import _kernels
+from gomoku_engine import GomokuEngine
+
+
+def _position():
+    board = np.zeros((15, 15), dtype=np.int8)
+    board[7, 7] = board[7, 8] = board[8, 8] = 1
+    board[6, 7] = board[6, 6] = board[9, 9] = 2
+    return board
+
+
+def test_aot_kernel_matches_jit_kernel():
+    """The ahead-of-time build scores every move exactly like the JIT kernel."""
+    aot = pytest.importorskip('_gomoku_kernels')
+    board = _position()
+    for row, col in zip(*np.nonzero(board == 0)):
+        for cutoff in (-np.inf, 1000.0):
+            args = (board, int(row), int(col), 1, 2, cutoff)
+            assert aot.evaluate_move_kernel(*args) == _kernels.evaluate_move_kernel(*args)
+
+
+@pytest.mark.parametrize('dtype', [np.int8, np.int32, np.int64])
+def test_get_best_move_arr_accepts_any_integer_dtype(dtype):
+    """Boards of other dtypes are converted before reaching the compiled kernels."""
+    board = _position()
+    expected = GomokuEngine().get_best_move_arr(board, 1)
+    assert GomokuEngine().get_best_move_arr(board.astype(dtype), 1) == expected
+    assert GomokuEngine().get_best_move_arr(np.asfortranarray(board.astype(dtype)), 1) == expected